@@ -2,15 +2,21 @@ import os
 from flask import Flask
 from flask_socketio import SocketIO
 from flask_cors import CORS # Import CORS
+from app import serialization
 
-socketio = SocketIO()
+# eventlet lets each Socket.IO handler run in its own green thread, so sessions
+# waiting on the LLM don't block each other. Packets are encoded with orjson.
+socketio = SocketIO(async_mode='eventlet', json=serialization)
 
 def create_app(test_config=None):
     # Create and configure the app
     app = Flask(__name__, instance_relative_config=True)
     app.config.from_mapping(
         SECRET_KEY='dev',
-        OPENROUTER_API_KEY=os.environ.get('OPENROUTER_API_KEY', '')
+        OPENROUTER_API_KEY=os.environ.get('OPENROUTER_API_KEY', ''),
+        # Redis URL (e.g. redis://localhost:6379/0) that lets several workers share
+        # Socket.IO events; leave unset when running a single worker
+        SOCKETIO_MESSAGE_QUEUE=os.environ.get('SOCKETIO_MESSAGE_QUEUE')
     )
 
     if test_config is None:
@@ -27,7 +33,7 @@ def create_app(test_config=None):
         pass
 
     # Register blueprints
-    from app.routes import main
+    from app.routes import main, agent
     app.register_blueprint(main)
 
     # Initialize CORS for the Flask app, allowing requests from the frontend origin
@@ -35,6 +41,11 @@ def create_app(test_config=None):
     CORS(app, resources={r"/api/*": {"origins": "*"}}) 
 
     # Initialize Socket.IO (keep existing CORS setting for Socket.IO)
-    socketio.init_app(app, cors_allowed_origins="*")
+    socketio.init_app(app, cors_allowed_origins="*",
+                      message_queue=app.config['SOCKETIO_MESSAGE_QUEUE'])
+
+    # Load the PPO policy and embedding model in the background so the first
+    # chat message doesn't pay for it
+    socketio.start_background_task(agent.warm_up)
 
     return app
@@ -1,17 +1,88 @@
 import os
-from typing import Tuple, Dict, Any
+import re
+import math
+import pickle
+import threading
+from typing import Tuple, Dict, Any, Optional
 from langchain_openai import ChatOpenAI
 from langchain.agents import AgentExecutor, create_react_agent, Tool
 from langchain import hub
 from langchain.memory import ConversationBufferMemory
 from langchain_core.prompts import PromptTemplate
-from stable_baselines3 import PPO # Import PPO
-import torch # Import torch if needed by PPO
 import numpy as np # Import numpy
+from numba import njit
 import json # Import json if needed for thinking process formatting
+from app.semantic_cache import SemanticCache, history_window, is_self_contained
+from app.embeddings import StateEncoder
+from app import embeddings
+from app.batching import MicroBatcher
+from app.policy import NumpyPolicy
+from app.reinforcement import extract_topics
+
+# key=value pairs in tool input strings, e.g. 'principal=300000, rate=6.5, term=30'
+# Values may be empty ('rate=') so the tools' float()/int() validation rejects them
+_PARAM_RE = re.compile(r"\s*([A-Za-z_][A-Za-z0-9_]*)\s*=\s*([^,]*?)\s*(?:,|$)")
+
+# Maximum number of OpenRouter calls a single worker keeps in flight at once
+MAX_CONCURRENT_LLM_CALLS = 8
+
+# Descriptions of the PPO actions, indexed by action id.
+# Actions 0-2 map to tools, the rest to a general LLM response.
+_PPO_ACTION_SUGGESTIONS = (
+    "Suggest: Use mortgage_calculator",
+    "Suggest: Use loan_eligibility_checker",
+    "Suggest: Use interest_rate_info",
+) + tuple(f"Suggest: General LLM response (Action {i})" for i in range(3, 10))
+
+# Minimum PPO action probability for skipping the ReAct loop and calling a tool directly
+PPO_SHORTCUT_CONFIDENCE = 0.85
+
+
+# Conversation turns that key the semantic cache together with the question. The
+# memory is shared by all sessions and grows with every answer, so keying on the
+# whole history never repeats; by default only self-contained questions are cached,
+# as stateless Q&A (see semantic_cache.is_self_contained).
+SEMANTIC_CACHE_CONTEXT_TURNS = 0
 
 # --- Tool Functions ---
 
+@njit(cache=True, fastmath=True)
+def _pmt_kernel(principal: float, rate_monthly: float, n_months: int) -> float:
+    """Compiled monthly payment formula (annuity payment, or straight-line at 0%)."""
+    # growth = (1 + r)^n - 1, computed without cancellation for tiny rates
+    growth = math.expm1(n_months * math.log1p(rate_monthly))
+    if growth == 0.0:
+        return principal / n_months
+    return principal * rate_monthly * (growth + 1.0) / growth
+
+@njit(cache=True, fastmath=True)
+def _pmt_360(principal: float, rate_monthly: float) -> float:
+    """Payment for a 30-year (360-month) term."""
+    growth = math.expm1(360 * math.log1p(rate_monthly))
+    if growth == 0.0:
+        return principal / 360
+    return principal * rate_monthly * (growth + 1.0) / growth
+
+@njit(cache=True, fastmath=True)
+def _pmt_180(principal: float, rate_monthly: float) -> float:
+    """Payment for a 15-year (180-month) term."""
+    growth = math.expm1(180 * math.log1p(rate_monthly))
+    if growth == 0.0:
+        return principal / 180
+    return principal * rate_monthly * (growth + 1.0) / growth
+
+# Most requests are for 30- or 15-year loans; these terms get kernels with the
+# term folded in as a constant
+_PMT_FIXED_TERM_KERNELS = {360: _pmt_360, 180: _pmt_180}
+
+# Compile (or load from the on-disk cache) at import, not on the first request
+_pmt_kernel(1.0, 0.01, 12)
+_pmt_360(1.0, 0.01)
+_pmt_180(1.0, 0.01)
+
+# Longest loan term (years) the mortgage calculator accepts
+MAX_TERM_YEARS = 50
+
 def _calculate_mortgage(input_str: str) -> str:
     """Calculate monthly mortgage payment."""
     try:
@@ -19,18 +90,25 @@ def _calculate_mortgage(input_str: str) -> str:
         principal = float(params.get("principal", 0))
         rate = float(params.get("rate", 0)) / 100 / 12  # Convert annual rate to monthly
         term = int(params.get("term", 0)) * 12  # Convert years to months
-        
-        if principal <= 0 or rate < 0 or term <= 0:
-            return "Invalid input: principal, rate, and term must be positive."
-            
-        if rate == 0:
-            monthly_payment = principal / term
-        else:
-            monthly_payment = principal * (rate * (1 + rate) ** term) / ((1 + rate) ** term - 1)
-        
-        return f"Monthly payment: ${monthly_payment:.2f}"
     except Exception as e:
         return f"Error calculating mortgage: {str(e)}"
+        
+    if not (math.isfinite(principal) and math.isfinite(rate)):
+        return "Invalid input: principal and rate must be finite numbers."
+    if principal <= 0 or rate < 0 or term <= 0:
+        return "Invalid input: principal, rate, and term must be positive."
+    if term > MAX_TERM_YEARS * 12:
+        return f"Invalid input: term must be at most {MAX_TERM_YEARS} years."
+        
+    fixed_term_kernel = _PMT_FIXED_TERM_KERNELS.get(term)
+    if fixed_term_kernel is not None:
+        monthly_payment = fixed_term_kernel(principal, rate)
+    else:
+        monthly_payment = _pmt_kernel(principal, rate, term)
+    if not math.isfinite(monthly_payment):
+        return "Invalid input: principal or rate is too large."
+    
+    return f"Monthly payment: ${monthly_payment:.2f}"
 
 def _check_eligibility(input_str: str) -> str:
     """Check loan eligibility based on provided parameters."""
@@ -63,35 +141,83 @@ Factors affecting rates:
 
 def _parse_parameters(input_str: str) -> Dict[str, Any]:
     """Parse parameters from input string (e.g., 'principal=300000, rate=6.5, term=30')."""
-    params = {}
-    try:
-        parts = input_str.split(",")
-        for part in parts:
-            if "=" in part:
-                key, value = part.split("=", 1)
-                params[key.strip()] = value.strip()
-    except Exception:
-        pass
-    return params
+    return {m.group(1): m.group(2) for m in _PARAM_RE.finditer(input_str)}
+
+# Tools the agent may call directly when the PPO policy confidently picks them,
+# keyed by PPO action: (tool name, function, parameters required in the message,
+# topic the message must be about)
+_PPO_TOOL_SHORTCUTS = {
+    0: ("mortgage_calculator", _calculate_mortgage, ("principal", "rate", "term"), "mortgage_calculation"),
+    1: ("loan_eligibility_checker", _check_eligibility, ("income", "credit_score", "dti"), "loan_eligibility"),
+    2: ("interest_rate_info", _get_interest_info, (), "interest_rates"),
+}
 
 # --- LangChain Agent Setup ---
 
+# The pulled ReAct prompt is cached in the Flask instance folder (backend/instance)
+_INSTANCE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance")
+_REACT_PROMPT_NAME = "hwchase17/react-chat"
+_REACT_PROMPT_CACHE_PATH = os.path.join(_INSTANCE_DIR, "react-chat.pkl")
+
+# Prompt shared by every agent created in this process
+_PROMPT_CACHE = None
+
+def _load_react_prompt(cache_path: str = _REACT_PROMPT_CACHE_PATH) -> PromptTemplate:
+    """
+    Get the ReAct prompt from LangChain Hub, keeping it in memory and on disk so
+    workers don't fetch it over the network every time they start.
+    """
+    global _PROMPT_CACHE
+    if _PROMPT_CACHE is not None:
+        return _PROMPT_CACHE
+
+    prompt = None
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                prompt = pickle.load(f)
+        except Exception as e:
+            print(f"Warning: Could not load cached prompt from {cache_path}: {e}")
+
+    if prompt is None:
+        prompt = hub.pull(_REACT_PROMPT_NAME)
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            # Write then rename, so concurrently starting workers never read a partial file
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(prompt, f)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            print(f"Warning: Could not cache prompt to {cache_path}: {e}")
+
+    _PROMPT_CACHE = prompt
+    return prompt
+
 class HomeLoanLangChainAgent:
     """Home loan assistant agent using LangChain ReAct, with PPO suggestion."""
     
-    def __init__(self, ppo_model_path="ppo_agent.zip"):
+    def __init__(self, ppo_model_path="ppo_agent.zip", ppo_shortcuts=None):
         self.api_key = os.environ.get("OPENROUTER_API_KEY")
+        # Whether a confident PPO tool choice may skip the LLM (see _try_ppo_shortcut).
+        # Off unless PPO_TOOL_SHORTCUTS is set: the policy is currently trained on hashed
+        # response buckets, not tool choices, so its confidence says nothing about which
+        # tool fits. Enable it once the policy is trained on real tool labels.
+        if ppo_shortcuts is None:
+            ppo_shortcuts = os.environ.get("PPO_TOOL_SHORTCUTS", "").lower() in ("1", "true", "yes")
+        self.ppo_shortcuts = ppo_shortcuts
         
-        # Load the trained PPO model if it exists
-        self.ppo_model = None
-        if os.path.exists(ppo_model_path):
-            try:
-                self.ppo_model = PPO.load(ppo_model_path)
-                print(f"Successfully loaded PPO model from {ppo_model_path}")
-            except Exception as e:
-                print(f"Warning: Could not load PPO model from {ppo_model_path}: {e}")
-        else:
-             print(f"Warning: PPO model file not found at {ppo_model_path}")
+        # The exported PPO policy and its state encoder are loaded on first use
+        # (or by warm_up); both sit next to the PPO model file
+        self.ppo_model_path = ppo_model_path
+        self.ppo_policy = None
+        self.state_encoder = None
+        self._ppo_loaded = False
+        # mtime (ns) of the policy file when it was last loaded; None if it did not exist
+        self._ppo_mtime = None
+        self._ppo_lock = threading.Lock()
+        # Coalesces PPO predictions from concurrent sessions into one forward pass
+        self._ppo_batcher = MicroBatcher(self._predict_ppo_batch)
 
         # Configure LLM (OpenRouter via OpenAI compatibility)
         self.llm = ChatOpenAI(
@@ -122,13 +248,13 @@ class HomeLoanLangChainAgent:
         ]
         
         # Get the ReAct prompt
-        prompt = hub.pull("hwchase17/react-chat")
+        prompt = _load_react_prompt()
         
         # Create the ReAct agent
         agent = create_react_agent(self.llm, self.tools, prompt)
         
         # Set up memory
-        self.memory = ConversationBufferMemory(memory_key="chat_history")
+        self.memory = ConversationBufferMemory(memory_key="chat_history", output_key="output")
         
         # Create the AgentExecutor
         self.agent_executor = AgentExecutor(
@@ -136,12 +262,22 @@ class HomeLoanLangChainAgent:
             tools=self.tools, 
             memory=self.memory, 
             verbose=True, # Set to True for debugging agent steps
-            handle_parsing_errors=True # Handle cases where LLM output is not parsable
+            handle_parsing_errors=True, # Handle cases where LLM output is not parsable
+            return_intermediate_steps=True # Needed for the thinking trace and cache checks
         )
 
+        # Semantic cache of previous answers, so repeated questions skip the LLM
+        self.response_cache = SemanticCache()
+
+        # Cap concurrent OpenRouter calls; the semaphore is green under eventlet
+        self._llm_slots = threading.BoundedSemaphore(MAX_CONCURRENT_LLM_CALLS)
+
     def get_response(self, user_input: str) -> Tuple[str, str]:
         """
         Get a response from the LangChain agent, including PPO suggestion if available.
+
+        Blocks on the LLM round-trip; under eventlet the socket I/O yields, so other
+        Socket.IO sessions keep being served while this one waits.
         
         Args:
             user_input: The user's message
@@ -150,74 +286,29 @@ class HomeLoanLangChainAgent:
             Tuple containing (agent_response, agent_thinking)
         """
         try:
-            # Handle direct tool calls first
-            if user_input.strip().startswith("/tool"):
-                parts = user_input.strip().split(" ", 2)
-                if len(parts) >= 2:
-                    tool_name = parts[1]
-                    params = parts[2] if len(parts) > 2 else ""
-                    thinking = f"Invoking tool directly: {tool_name} with params: {params}\n"
-                    if tool_name == "mortgage_calculator":
-                        response = _calculate_mortgage(params)
-                    elif tool_name == "loan_eligibility" or tool_name == "loan_eligibility_checker": # Accept both names
-                        response = _check_eligibility(params)
-                    elif tool_name == "interest_rate_info":
-                        response = _get_interest_info(params)
-                    else:
-                        response = f"Unknown tool: {tool_name}"
-                    # Add to memory manually if needed, or let the main flow handle it
-                    # self.memory.save_context({"input": user_input}, {"output": response}) 
-                    return response, thinking
-                else:
-                    return "Invalid tool command format. Use: /tool tool_name params", "Invalid command"
-
-            # --- PPO Suggestion (Demonstration) ---
-            ppo_suggestion_text = "PPO Model not loaded."
-            if self.ppo_model:
-                try:
-                    # Use the same simple state hashing as the old agent/training for demo
-                    state_int = abs(hash(user_input)) % 1000 
-                    # Convert state to NumPy array with explicit dtype
-                    state_np = np.array([state_int], dtype=np.int64) 
-                    # Pass the NumPy array to predict
-                    action_index, _ = self.ppo_model.predict(state_np, deterministic=True)
-                    # Map index to a descriptive action (based on OldHomeLoanAgent logic)
-                    action_map = { 
-                        0: "Suggest: Use mortgage_calculator", 
-                        1: "Suggest: Use loan_eligibility_checker", 
-                        2: "Suggest: Use interest_rate_info",
-                        # Indices 3-9 mapped to general LLM call
-                    }
-                    # Use action_index[0] as predict returns an array
-                    ppo_suggestion_text = action_map.get(action_index[0], f"Suggest: General LLM response (Action {action_index[0]})") 
-                except Exception as ppo_e:
-                    ppo_suggestion_text = f"PPO Error: {ppo_e}"
-            # --- End PPO Suggestion ---
+            direct_result = self._run_direct_tool(user_input)
+            if direct_result is not None:
+                return direct_result
+
+            context = history_window(self.memory.chat_memory.messages, SEMANTIC_CACHE_CONTEXT_TURNS)
+            # Follow-ups depend on the (shared) history, so they bypass the cache
+            cacheable = is_self_contained(user_input)
+            cached_result = self._get_cached_response(user_input, context) if cacheable else None
+            if cached_result is not None:
+                return cached_result
+
+            ppo_probs, ppo_suggestion_text = self._get_ppo_suggestion(user_input)
+            shortcut_result = self._try_ppo_shortcut(user_input, ppo_probs, ppo_suggestion_text)
+            if shortcut_result is not None:
+                return shortcut_result
 
             # Invoke the main LangChain agent executor
-            result = self.agent_executor.invoke({"input": user_input})
-            
-            response = result.get("output", "Sorry, I encountered an issue.")
-            
-            # Combine PPO suggestion with LangChain agent thinking
-            thinking = f"PPO Model: {ppo_suggestion_text}\n---\nLangChain Agent:\n"
-            
-            # Manually format intermediate steps for robustness
-            intermediate_steps_str = ""
-            steps = result.get('intermediate_steps', [])
-            if steps:
-                for i, step in enumerate(steps):
-                    action, observation = step # Unpack the tuple
-                    intermediate_steps_str += f"Step {i+1}:\n"
-                    intermediate_steps_str += f"  Action: {action.tool}\n"
-                    intermediate_steps_str += f"  Action Input: {action.tool_input}\n"
-                    # Convert observation to string safely
-                    observation_str = str(observation) 
-                    intermediate_steps_str += f"  Observation: {observation_str}\n"
-                thinking += intermediate_steps_str
-            else:
-                 thinking += "(No intermediate steps taken)\n"
+            with self._llm_slots:
+                result = self.agent_executor.invoke({"input": user_input})
 
+            response, thinking = self._format_result(result, ppo_suggestion_text)
+            if cacheable:
+                self._cache_response(user_input, context, result, response, thinking)
             return response, thinking
             
         except Exception as e:
@@ -226,142 +317,190 @@ class HomeLoanLangChainAgent:
             print(traceback.format_exc())
             return f"I encountered an error processing your request: {str(e)}", "Error occurred"
 
-# Note: The OldHomeLoanAgent and SimpleLLM classes are no longer used by routes.py
-# They could be removed, but are kept here for reference.
-class SimpleLLM:
-    """Simple LLM implementation for demonstration purposes."""
-    
-    def __init__(self, api_key=None, model_name=None, temperature=0.7):
-        self.api_key = api_key or os.environ.get("OPENROUTER_API_KEY")
-        self.model_name = model_name or "anthropic/claude-3-opus"
-        self.temperature = temperature
-        
-    def invoke(self, prompt):
-        """Call the OpenRouter API for completions."""
+    def warm_up(self) -> None:
+        """Load the PPO policy and embedding model ahead of the first request."""
+        self._ensure_ppo_loaded()
         try:
-            import requests
-            url = "https://openrouter.ai/api/v1/chat/completions"
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            data = {
-                "model": self.model_name,
-                "messages": [
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": self.temperature
-            }
-            response = requests.post(url, headers=headers, json=data, timeout=30)
-            response.raise_for_status()
-            result = response.json()
-            # Extract the assistant's reply
-            return result["choices"][0]["message"]["content"]
+            embeddings.warm_up()
         except Exception as e:
-            return f"Error calling OpenRouter API: {str(e)}"
+            print(f"Warning: Could not load embedding model: {e}")
 
-class OldHomeLoanAgent:
-    """Home loan assistant agent using a simplified LLM implementation."""
-    
-    def __init__(self):
-        self.api_key = os.environ.get("OPENROUTER_API_KEY")
-        self.llm = SimpleLLM(api_key=self.api_key)
-
-        # PPO RL policy
-        self.ppo_model = None
-        self.ppo_actions = [
-            "Sure, I can help you with that.",
-            "Let's calculate your mortgage payment.",
-            "You may be eligible for a home loan.",
-            "Current interest rates are around 6.5%.",
-            "Please provide more details about your income.",
-            "I recommend checking your credit score.",
-            "Would you like to use the mortgage calculator tool?",
-            "You can improve eligibility by reducing your DTI.",
-            "Ask me about loan types or the buying process.",
-            "Let me connect you to a loan officer."
-        ]
+    def reload_ppo(self) -> None:
+        """Load the PPO policy and state encoder again, e.g. after training wrote new files."""
+        with self._ppo_lock:
+            self._ppo_loaded = False
+        self._ensure_ppo_loaded()
+
+    def _ensure_ppo_loaded(self) -> None:
+        """
+        Load the trained PPO policy and its state encoder, and load them again
+        whenever the policy file changes (training may finish in another worker).
+        """
+        policy_path = self.ppo_model_path.replace(".zip", "_policy.npz")
         try:
-            from stable_baselines3 import PPO
-            import torch
-            if os.path.exists("ppo_agent.zip"):
-                self.ppo_model = PPO.load("ppo_agent.zip")
+            mtime = os.stat(policy_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if self._ppo_loaded and mtime == self._ppo_mtime:
+            return
+        with self._ppo_lock:
+            if self._ppo_loaded and mtime == self._ppo_mtime:
+                return
+
+            if mtime is not None:
+                try:
+                    # The state encoder fitted for this policy is stored in the same file
+                    with np.load(policy_path) as data:
+                        ppo_policy = NumpyPolicy.from_arrays(data)
+                        state_encoder = StateEncoder(data["state_mean"], data["state_components"])
+                    self.ppo_policy, self.state_encoder = ppo_policy, state_encoder
+                    print(f"Successfully loaded PPO policy from {policy_path}")
+                except Exception as e:
+                    print(f"Warning: Could not load PPO policy from {policy_path}: {e}")
+            else:
+                 print(f"Warning: PPO policy file not found at {policy_path}")
+
+            self._ppo_mtime = mtime
+            self._ppo_loaded = True
+
+    def _run_direct_tool(self, user_input: str) -> Optional[Tuple[str, str]]:
+        """Handle '/tool <name> <params>' commands; returns None for regular messages."""
+        if not user_input.strip().startswith("/tool"):
+            return None
+
+        parts = user_input.strip().split(" ", 2)
+        if len(parts) < 2:
+            return "Invalid tool command format. Use: /tool tool_name params", "Invalid command"
+
+        tool_name = parts[1]
+        params = parts[2] if len(parts) > 2 else ""
+        thinking = f"Invoking tool directly: {tool_name} with params: {params}\n"
+        if tool_name == "mortgage_calculator":
+            response = _calculate_mortgage(params)
+        elif tool_name == "loan_eligibility" or tool_name == "loan_eligibility_checker": # Accept both names
+            response = _check_eligibility(params)
+        elif tool_name == "interest_rate_info":
+            response = _get_interest_info(params)
+        else:
+            response = f"Unknown tool: {tool_name}"
+        # Add to memory manually if needed, or let the main flow handle it
+        # self.memory.save_context({"input": user_input}, {"output": response}) 
+        return response, thinking
+
+    def _get_cached_response(self, user_input: str, context: str) -> Optional[Tuple[str, str]]:
+        """Return a cached (response, thinking) for a similar question, or None."""
+        try:
+            cached = self.response_cache.lookup(user_input, context)
         except Exception as e:
-            self.ppo_model = None
+            print(f"Warning: Semantic cache lookup failed: {e}")
+            return None
+        if cached is None:
+            return None
 
-        # Define tools for the agent
-        self.tools = [
-            Tool(
-                name="mortgage_calculator",
-                func=_calculate_mortgage,
-                description="Calculate monthly mortgage payment given principal, interest rate, and term"
-            ),
-            Tool(
-                name="loan_eligibility",
-                func=_check_eligibility,
-                description="Check loan eligibility based on income, credit score, and debt-to-income ratio"
-            ),
-            Tool(
-                name="interest_rate_info",
-                func=_get_interest_info,
-                description="Get information about current interest rates and factors affecting them"
-            )
-        ]
-        
-        # Set up memory
-        self.memory = []
-    
-    def get_response(self, user_input: str) -> Tuple[str, str]:
+        response, thinking, similarity = cached
+        # Keep the conversation history consistent with an uncached answer
+        self.memory.save_context({"input": user_input}, {"output": response})
+        return response, f"Served from semantic cache (similarity {similarity:.3f})\n---\n{thinking}"
+
+    def _cache_response(self, user_input: str, context: str, result: Dict[str, Any],
+                        response: str, thinking: str) -> None:
         """
-        Get a response from the agent. If the message starts with /tool, call the tool directly.
-        Otherwise, use the OpenRouter LLM for the response.
+        Cache an answer unless its trajectory called a tool: tool answers depend on the
+        exact figures in the question (or on live data), which embeddings can't tell apart.
         """
+        if result.get('intermediate_steps'):
+            return
         try:
-            self.memory.append({"role": "user", "content": user_input})
-            thinking = ""
-            if user_input.strip().startswith("/tool"):
-                parts = user_input.strip().split(" ", 2)
-                if len(parts) >= 2:
-                    tool_name = parts[1]
-                    params = parts[2] if len(parts) > 2 else ""
-                    thinking = f"Invoking tool: {tool_name} with params: {params}\n"
-                    if tool_name == "mortgage_calculator":
-                        response = _calculate_mortgage(params)
-                    elif tool_name == "loan_eligibility":
-                        response = _check_eligibility(params)
-                    elif tool_name == "interest_rate_info":
-                        response = _get_interest_info(params)
-                    else:
-                        response = f"Unknown tool: {tool_name}"
-                else:
-                    response = "Invalid tool command format. Use: /tool tool_name params"
-            else:
-                # If PPO model is loaded, use it to select an action
-                if self.ppo_model is not None:
-                    thinking = "Using PPO RL policy for response selection.\n"
-                    # For demo: state = hash of user_input % 1000
-                    state = abs(hash(user_input)) % 1000
-                    action, _ = self.ppo_model.predict(state, deterministic=True)
-                    
-                    # Map action to tool or LLM call
-                    if action == 0:
-                        thinking += "PPO chose mortgage_calculator tool.\n"
-                        # For demo, use default params
-                        response = _calculate_mortgage("principal=300000, rate=6.5, term=30")
-                    elif action == 1:
-                        thinking += "PPO chose loan_eligibility tool.\n"
-                        # For demo, use default params
-                        response = _check_eligibility("income=75000, credit_score=720, dti=35")
-                    elif action == 2:
-                        thinking += "PPO chose interest_rate_info tool.\n"
-                        response = _get_interest_info("")
-                    else: # Actions 3-9: Call LLM
-                        thinking += "PPO chose to call LLM.\n"
-                        response = self.llm.invoke(user_input)
-                else:
-                    thinking = "No PPO model loaded. Sending user input to OpenRouter LLM API.\n"
-                    response = self.llm.invoke(user_input)
-            self.memory.append({"role": "assistant", "content": response})
-            return response, thinking
+            self.response_cache.store(user_input, context, response, thinking)
         except Exception as e:
-            return f"I encountered an error: {str(e)}", "Error occurred during processing"
+            print(f"Warning: Could not store response in semantic cache: {e}")
+
+    def _get_ppo_suggestion(self, user_input: str) -> Tuple[Optional[np.ndarray], str]:
+        """
+        Ask the PPO policy which action it would take.
+
+        Returns:
+            Tuple of (action probabilities or None, suggestion text)
+        """
+        self._ensure_ppo_loaded()
+        if not (self.ppo_policy and self.state_encoder):
+            return None, "PPO Model not loaded."
+        try:
+            # Encode the message the same way training did
+            state_np = self.state_encoder.encode(user_input)
+            # Batched together with concurrent requests from other sessions
+            probs = self._ppo_batcher.submit(state_np).result()
+            return probs, self._describe_ppo_action(np.argmax(probs))
+        except Exception as ppo_e:
+            return None, f"PPO Error: {ppo_e}"
+
+    def _predict_ppo_batch(self, states: np.ndarray) -> np.ndarray:
+        """PPO action probabilities for a (batch, STATE_DIM) array of states."""
+        return self.ppo_policy.action_probs(states)
+
+    def _try_ppo_shortcut(self, user_input: str, ppo_probs: Optional[np.ndarray],
+                          ppo_suggestion_text: str) -> Optional[Tuple[str, str]]:
+        """
+        Answer with a tool directly, skipping the ReAct loop, when shortcuts are enabled,
+        the PPO policy picks that tool with high confidence, the message is about the
+        tool's topic and it already contains every parameter the tool needs. Returns
+        None when the agent should run as usual.
+        """
+        if not self.ppo_shortcuts or ppo_probs is None:
+            return None
+        action = int(np.argmax(ppo_probs))
+        confidence = float(ppo_probs[action])
+        if confidence <= PPO_SHORTCUT_CONFIDENCE or action not in _PPO_TOOL_SHORTCUTS:
+            return None
+
+        tool_name, tool_func, required_params, required_topic = _PPO_TOOL_SHORTCUTS[action]
+        # The policy's confidence alone is no evidence of intent
+        if required_topic not in extract_topics(user_input):
+            return None
+        params = _parse_parameters(user_input)
+        if any(name not in params for name in required_params):
+            return None
+
+        tool_input = ", ".join(f"{name}={params[name]}" for name in required_params)
+        response = tool_func(tool_input)
+        # Keep the conversation history consistent with an agent answer
+        self.memory.save_context({"input": user_input}, {"output": response})
+        thinking = (f"PPO Model: {ppo_suggestion_text} (confidence {confidence:.2f})\n---\n"
+                    f"Called {tool_name} directly with: {tool_input}\n"
+                    f"(LangChain agent skipped)\n")
+        return response, thinking
+
+    @staticmethod
+    def _describe_ppo_action(action) -> str:
+        """Human-readable suggestion for a PPO action index."""
+        idx = int(action)
+        if 0 <= idx < len(_PPO_ACTION_SUGGESTIONS):
+            return _PPO_ACTION_SUGGESTIONS[idx]
+        return f"Suggest: General LLM response (Action {idx})"
+
+    def _format_result(self, result: Dict[str, Any], ppo_suggestion_text: str) -> Tuple[str, str]:
+        """Turn an AgentExecutor result into (response, thinking)."""
+        response = result.get("output", "Sorry, I encountered an issue.")
+        
+        # Combine PPO suggestion with LangChain agent thinking; pieces are collected
+        # and joined once rather than concatenated step by step
+        parts = [f"PPO Model: {ppo_suggestion_text}\n---\nLangChain Agent:\n"]
+        parts_append = parts.append
+        
+        # Manually format intermediate steps for robustness
+        steps = result.get('intermediate_steps', [])
+        if steps:
+            for i, (action, observation) in enumerate(steps):
+                # f-string formatting converts the observation to a string safely
+                parts_append(
+                    f"Step {i+1}:\n"
+                    f"  Action: {action.tool}\n"
+                    f"  Action Input: {action.tool_input}\n"
+                    f"  Observation: {observation}\n"
+                )
+        else:
+             parts_append("(No intermediate steps taken)\n")
+
+        thinking = "".join(parts)
+
+        return response, thinking
@@ -0,0 +1,63 @@
+import queue
+import threading
+import time
+import numpy as np
+from concurrent.futures import Future
+from typing import Callable
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row requests into one batched call.
+
+    Callers submit one row and get a Future back. A background worker collects rows
+    for up to max_wait seconds (or max_batch rows), runs batch_fn once on the
+    stacked rows and resolves each Future with its row of the result. Built on
+    threading/queue, so under eventlet the worker is a green thread.
+    """
+
+    def __init__(self, batch_fn: Callable[[np.ndarray], np.ndarray],
+                 max_batch: int = 32, max_wait: float = 0.005):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def submit(self, row: np.ndarray) -> Future:
+        """Queue one row; the Future resolves to the matching row of batch_fn's output."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((row, future))
+        return future
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                    self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            # Block for the first row, then gather more until the batch is full or time is up
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(items) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            rows, futures = zip(*items)
+            try:
+                results = self.batch_fn(np.stack(rows))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, result in zip(futures, results):
+                future.set_result(result)
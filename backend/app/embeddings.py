@@ -0,0 +1,79 @@
+import functools
+import threading
+import numpy as np
+from typing import Iterable
+
+# Small sentence-embedding model, fast enough to run once per query on CPU
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Size of the PPO observation vector produced by StateEncoder
+STATE_DIM = 16
+
+_model = None
+_model_lock = threading.Lock()
+
+def _get_model():
+    """Load the embedding model on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                import torch
+                from sentence_transformers import SentenceTransformer
+                # One intra-op thread per worker avoids OpenMP oversubscription
+                # when several workers share the machine
+                torch.set_num_threads(1)
+                model = SentenceTransformer(EMBEDDING_MODEL_NAME, device="cpu")
+                # int8 weights for the Linear layers: this forward pass runs on every request
+                _model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return _model
+
+def warm_up() -> None:
+    """Load the embedding model ahead of the first request."""
+    _get_model()
+
+@functools.lru_cache(maxsize=4096)
+def embed(text: str) -> np.ndarray:
+    """
+    Embed a piece of text.
+
+    Args:
+        text: The text to embed
+
+    Returns:
+        Read-only, L2-normalized float32 vector (cached per text)
+    """
+    vector = _get_model().encode(text, normalize_embeddings=True, convert_to_numpy=True)
+    vector = vector.astype(np.float32)
+    vector.setflags(write=False)
+    return vector
+
+class StateEncoder:
+    """
+    Maps a user message to the PPO observation: its sentence embedding projected
+    onto a fixed PCA basis fitted on the training messages.
+    """
+
+    def __init__(self, mean: np.ndarray, components: np.ndarray):
+        self.mean = mean.astype(np.float32)
+        self.components = components.astype(np.float32)  # (STATE_DIM, embedding_dim)
+
+    @classmethod
+    def fit(cls, texts: Iterable[str], n_components: int = STATE_DIM) -> "StateEncoder":
+        """Fit the PCA basis on the embeddings of the given messages."""
+        embeddings = np.stack([embed(text) for text in texts])
+        mean = embeddings.mean(axis=0)
+        _, _, vt = np.linalg.svd(embeddings - mean, full_matrices=False)
+        # With fewer messages than components the extra dimensions stay zero
+        components = np.zeros((n_components, embeddings.shape[1]), dtype=np.float32)
+        k = min(n_components, vt.shape[0])
+        components[:k] = vt[:k]
+        return cls(mean, components)
+
+    def encode(self, text: str) -> np.ndarray:
+        """Observation vector (float32, shape (STATE_DIM,)) for one message."""
+        return (embed(text) - self.mean) @ self.components.T
+
+    def encode_batch(self, texts: Iterable[str]) -> np.ndarray:
+        """Observation matrix (float32, shape (n, STATE_DIM)) for several messages."""
+        return (np.stack([embed(text) for text in texts]) - self.mean) @ self.components.T
@@ -0,0 +1,10 @@
+import hashlib
+
+def stable_hash(text: str) -> int:
+    """
+    64-bit hash (BLAKE2b, 8-byte digest) of the UTF-8 bytes of text.
+
+    Unlike the built-in hash(), the result does not depend on PYTHONHASHSEED,
+    so it is the same in every process and across runs.
+    """
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
@@ -0,0 +1,49 @@
+import numpy as np
+from typing import List, Tuple
+
+class NumpyPolicy:
+    """
+    Inference-only copy of the trained PPO policy network.
+
+    Evaluates the MlpPolicy actor (tanh hidden layers followed by the action head)
+    with NumPy, using weights exported by ppo_train.export_policy_weights, so the
+    request path needs neither stable_baselines3 nor torch.
+    """
+
+    def __init__(self, hidden_layers: List[Tuple[np.ndarray, np.ndarray]],
+                 action_weight: np.ndarray, action_bias: np.ndarray):
+        self.hidden_layers = hidden_layers  # [(W, b), ...] with W shaped (out, in)
+        self.action_weight = action_weight
+        self.action_bias = action_bias
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "NumpyPolicy":
+        """Build a policy from exported arrays (a dict or an open .npz)."""
+        hidden_layers = []
+        i = 0
+        while f"W{i}" in arrays:
+            hidden_layers.append((arrays[f"W{i}"], arrays[f"b{i}"]))
+            i += 1
+        return cls(hidden_layers, arrays["Wact"], arrays["bact"])
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyPolicy":
+        with np.load(path) as data:
+            return cls.from_arrays(data)
+
+    def action_logits(self, states: np.ndarray) -> np.ndarray:
+        """Action logits for a (batch, obs_dim) array of states."""
+        h = states
+        for weight, bias in self.hidden_layers:
+            h = np.tanh(h @ weight.T + bias)
+        return h @ self.action_weight.T + self.action_bias
+
+    def action_probs(self, states: np.ndarray) -> np.ndarray:
+        """Action probabilities (softmax over logits) for a batch of states."""
+        logits = self.action_logits(states)
+        exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def predict(self, states: np.ndarray) -> np.ndarray:
+        """Deterministic actions (argmax over logits) for a batch of states."""
+        return np.argmax(self.action_logits(states), axis=-1)
@@ -1,35 +1,114 @@
+import math
 import os
 import pickle
+import numpy as np
+import torch
 from stable_baselines3 import PPO
 from stable_baselines3.common.env_util import make_vec_env
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
 from app.rl_env import HomeLoanAgentEnv
-from app.reinforcement import ReinforcementLoop
+from app.embeddings import StateEncoder
 
-def train_ppo_agent(reinforcement_loop: ReinforcementLoop, model_path="ppo_agent.zip"):
+# PPO's default rollout and minibatch sizes; the rollout is split across environments
+# so each update sees about the same amount of data
+_ROLLOUT_STEPS = 2048
+_BATCH_SIZE = 64
+
+# The env step is a couple of array lookups, so more environments than this only
+# add overhead (and pipe round-trips when they run in subprocesses)
+_MAX_ENVS = 4
+
+def _rollout_steps_per_env(n_envs: int) -> int:
+    """
+    n_steps for PPO: about _ROLLOUT_STEPS in total, rounded down so the rollout
+    (n_steps * n_envs) splits into whole minibatches of _BATCH_SIZE.
+    """
+    step = _BATCH_SIZE // math.gcd(_BATCH_SIZE, n_envs)
+    return max(_ROLLOUT_STEPS // n_envs // step * step, step)
+
+def export_policy_weights(model: PPO, path: str, state_encoder: StateEncoder) -> None:
+    """
+    Save the actor network of a trained MlpPolicy as plain arrays for NumpyPolicy:
+    W0/b0, W1/b1, ... for the tanh hidden layers and Wact/bact for the action head.
+
+    The state encoder the policy was trained with is stored in the same file
+    (state_mean/state_components), and the file is replaced in one step, so a
+    reader never sees a policy paired with another training run's encoder.
+    """
+    arrays = {}
+    hidden_index = 0
+    for module in model.policy.mlp_extractor.policy_net:
+        if isinstance(module, torch.nn.Linear):
+            arrays[f"W{hidden_index}"] = module.weight.detach().cpu().numpy()
+            arrays[f"b{hidden_index}"] = module.bias.detach().cpu().numpy()
+            hidden_index += 1
+        elif not isinstance(module, torch.nn.Tanh):
+            raise ValueError(f"Unsupported policy layer for NumPy export: {module}")
+    arrays["Wact"] = model.policy.action_net.weight.detach().cpu().numpy()
+    arrays["bact"] = model.policy.action_net.bias.detach().cpu().numpy()
+
+    arrays["state_mean"] = state_encoder.mean
+    arrays["state_components"] = state_encoder.components
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+def train_ppo_agent(episodes, model_path="ppo_agent.zip", n_envs=None, subprocess_envs=False):
+    """
+    Train the PPO agent on episodes from ReinforcementLoop.export_episodes_for_rl.
+
+    Takes plain (user_input, action, reward, text_feedback) tuples rather than the
+    loop itself, so it can run in a separate process. The n_envs environments
+    (default: one per core, at most _MAX_ENVS) step in this process unless
+    subprocess_envs is set.
+    """
     try:
-        print("Exporting episodes for RL training...")
-        episodes = reinforcement_loop.export_episodes_for_rl()
         print(f"Number of episodes: {len(episodes)}")
         if not episodes:
             print("No episodes available for training.")
             return None
 
-        # Extract only (state, action, reward) for the current simplified environment
+        # Fit the state encoder on the training messages; it is exported with the
+        # policy, so inference builds observations exactly the way training did
+        print("Fitting state encoder...")
+        texts = [text for text, _, _, _ in episodes]
+        state_encoder = StateEncoder.fit(texts)
+        states = state_encoder.encode_batch(texts).astype(np.float32)
+
+        # Extract only (state, action, reward) for the current simplified environment,
+        # as contiguous parallel arrays the env can index directly
         # The text_feedback is available in `episodes` for future enhancements
-        training_data = [(s, a, r) for s, a, r, txt in episodes]
+        actions = np.fromiter((a for _, a, _, _ in episodes), dtype=np.int64, count=len(episodes))
+        rewards = np.fromiter((r for _, _, r, _ in episodes), dtype=np.float32, count=len(episodes))
         
-        print("Creating RL environment...")
-        env = HomeLoanAgentEnv(training_data) # Pass only (s, a, r)
-        vec_env = make_vec_env(lambda: env, n_envs=1)
-
-        print("Initializing PPO agent...")
-        model = PPO("MlpPolicy", vec_env, verbose=1)
-        print("Starting PPO training...")
-        # Increase timesteps for more meaningful training
-        model.learn(total_timesteps=10000) 
+        n_envs = n_envs or min(os.cpu_count() or 1, _MAX_ENVS)
+        print(f"Creating {n_envs} RL environment(s)...")
+        vec_env = make_vec_env(
+            HomeLoanAgentEnv,
+            n_envs=n_envs,
+            env_kwargs={"states": states, "actions": actions, "rewards": rewards},
+            vec_env_cls=SubprocVecEnv if subprocess_envs and n_envs > 1 else DummyVecEnv,
+        )
+
+        try:
+            print("Initializing PPO agent...")
+            model = PPO("MlpPolicy", vec_env, n_steps=_rollout_steps_per_env(n_envs),
+                        batch_size=_BATCH_SIZE, verbose=1)
+            print("Starting PPO training...")
+            # Increase timesteps for more meaningful training
+            model.learn(total_timesteps=10000) 
+        finally:
+            vec_env.close()
         print("Training complete. Saving model...")
         model.save(model_path)
         print(f"Trained PPO agent saved to {model_path}")
+
+        # Export the policy weights for inference without stable_baselines3/torch
+        policy_path = model_path.replace(".zip", "_policy.npz")
+        export_policy_weights(model, policy_path, state_encoder)
+        print(f"Policy weights exported to {policy_path}")
         
         # Save training timestamp
         version_file = model_path.replace(".zip", "_version.txt")
@@ -49,7 +128,9 @@ def train_ppo_agent(reinforcement_loop: ReinforcementLoop, model_path="ppo_agent
         return None
 
 if __name__ == "__main__":
+    from app.reinforcement import ReinforcementLoop
+
     # For demo: load or create a ReinforcementLoop and train
     rl = ReinforcementLoop()
     # Optionally, load interactions/feedback from disk here
-    train_ppo_agent(rl)
+    train_ppo_agent(rl.export_episodes_for_rl())
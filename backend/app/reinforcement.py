@@ -1,10 +1,100 @@
+import functools
+import logging
+import re
 import uuid
 import time
-import json
 import numpy as np
-import networkx as nx
-from typing import Dict, List, Any, Optional
+import ahocorasick
+from typing import Dict, List, Any, Optional, Tuple
 import os # Import os module
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from app.serialization import dumps_bytes
+from app.hashing import stable_hash
+
+# Simple keyword-based topic extraction: (topic, keywords) in reporting order
+_TOPIC_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ('mortgage_calculation', ('calculate', 'payment', 'monthly', 'mortgage', 'principal', 'interest')),
+    ('loan_eligibility', ('eligible', 'eligibility', 'qualify', 'qualification', 'income', 'credit')),
+    ('interest_rates', ('rate', 'interest', 'apr', 'percentage', 'fixed', 'variable')),
+    ('loan_types', ('conventional', 'fha', 'va', 'usda', 'jumbo', 'fixed', 'arm')),
+    ('home_buying_process', ('process', 'buying', 'purchase', 'offer', 'closing', 'escrow')),
+)
+_TOPIC_NAMES: Tuple[str, ...] = tuple(topic for topic, _ in _TOPIC_KEYWORDS)
+
+def _build_keyword_to_topics() -> Dict[str, Tuple[str, ...]]:
+    """Invert _TOPIC_KEYWORDS into keyword -> topics."""
+    keyword_topics = defaultdict(list)
+    for topic, keywords in _TOPIC_KEYWORDS:
+        for keyword in keywords:
+            keyword_topics[keyword].append(topic)
+    return {keyword: tuple(topics) for keyword, topics in keyword_topics.items()}
+
+_KEYWORD_TO_TOPICS: Dict[str, Tuple[str, ...]] = _build_keyword_to_topics()
+
+def _build_topic_automaton() -> ahocorasick.Automaton:
+    """Build the multi-pattern matcher over all topic keywords."""
+    automaton = ahocorasick.Automaton()
+    for keyword, topics in _KEYWORD_TO_TOPICS.items():
+        automaton.add_word(keyword, topics)
+    automaton.make_automaton()
+    return automaton
+
+logger = logging.getLogger(__name__)
+
+# Aho-Corasick automaton mapping each keyword to the topics it signals, shared by all loops
+_TOPIC_AUTOMATON = _build_topic_automaton()
+
+@functools.lru_cache(maxsize=4096)
+def extract_topics(text: str) -> Tuple[str, ...]:
+    """Topics mentioned in text (cached per text, since repeated messages are common)."""
+    # One pass over the text finds every keyword occurrence
+    found = set()
+    for _, keyword_topics in _TOPIC_AUTOMATON.iter(text.lower()):
+        found.update(keyword_topics)
+
+    # Report topics in keyword-table order
+    return tuple(topic for topic in _TOPIC_NAMES if topic in found) or ('general',)
+
+# Feedback cues that lower the reward of an answer (too long, or not explained enough).
+# Plain substrings like the original checks, so e.g. "unexplained" also matches.
+_SHAPING_RE = re.compile(r"concise|explain|more detail", re.IGNORECASE)
+
+# Metric series recorded once per rating, with their buffer dtypes:
+#   ratings               - all ratings
+#   timestamps            - timestamp of each rating
+#   average_ratings       - running average rating
+#   accuracy              - running accuracy (percentage of ratings >= 4)
+#   recent_average_rating - average rating over the last 10 evals
+_METRIC_SERIES = {
+    'ratings': np.int8,
+    'timestamps': np.float64,
+    'average_ratings': np.float64,
+    'accuracy': np.float64,
+    'recent_average_rating': np.float64,
+}
+_INITIAL_SERIES_CAPACITY = 64
+
+@dataclass(slots=True)
+class Interaction:
+    """One user message and the agent's answer, plus the feedback once it is given."""
+    user_input: str
+    agent_response: str
+    timestamp: float
+    topics: Tuple[str, ...]
+    feedback: Optional[int] = None  # Rating (1-5)
+    text_feedback: str = ''
+    topic_set: frozenset = field(init=False)
+
+    def __post_init__(self):
+        self.topic_set = frozenset(self.topics)
+
+@dataclass(frozen=True, slots=True)
+class Feedback:
+    """A rating (1-5) and optional comment given for an interaction."""
+    rating: int
+    text: str
+    timestamp: float
 
 class ReinforcementLoop:
     """
@@ -14,26 +104,57 @@ class ReinforcementLoop:
     
     def __init__(self):
         # Store interactions with unique IDs
-        self.interactions = {}
+        self.interactions: Dict[str, Interaction] = {}
         
         # Track feedback for each interaction
-        self.feedback = {}
+        self.feedback: Dict[str, Feedback] = {}
         
-        # Store the learning graph for visualization
-        self.learning_graph = nx.DiGraph()
+        # Learning graph for visualization. Nodes get integer IDs (their position in
+        # _nodes) and are stored as (type, interaction_id, data); edges are
+        # (source, target, type, weight) over those IDs. String node IDs are only
+        # built when the graph is serialized (see _get_graph_data).
+        self._nodes: List[Tuple[str, str, Dict[str, Any]]] = []
+        self._edges: List[Tuple[int, int, str, int]] = []
+        self._edge_keys = set()
+        self._id_map: Dict[str, int] = {}           # interaction ID -> interaction node
+        self._feedback_id_map: Dict[str, int] = {}  # interaction ID -> its feedback node
+
+        # Inverted index: topic -> IDs of interactions tagged with it
+        self._topic_index = defaultdict(set)
         
         # Track performance metrics over time
         self.performance_metrics = {
-            'ratings': [],          # List of all ratings
-            'timestamps': [],       # List of timestamps for each rating
-            'average_ratings': [],  # List of running average ratings
-            'accuracy': [],         # List of running accuracy (ratings >= 4)
             'rating_distribution': {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}, # Counts for each rating
-            'recent_average_rating': [], # List of average rating over last 10 evals
             'topics': {}            # Topic-specific metrics
         }
-        # Define the path relative to the project root (assuming run.py is there)
-        self.version_file_path = "backend/ppo_agent_version.txt" 
+        # Per-rating series (see _METRIC_SERIES) in preallocated buffers;
+        # only the first self._n entries are valid
+        self._series = {
+            name: np.empty(_INITIAL_SERIES_CAPACITY, dtype=dtype)
+            for name, dtype in _METRIC_SERIES.items()
+        }
+        self._n = 0
+        # Running totals so metrics update in O(1) per rating
+        self._rating_sum = 0
+        self._good_count = 0  # Ratings >= 4
+        self._recent_ratings = deque(maxlen=10)
+        self._recent_sum = 0
+        self._topic_rating_sums = defaultdict(int)  # topic -> sum of its ratings
+        # Visualization payload (without agent_version), rebuilt only after a mutation,
+        # and its serialized form keyed on the agent version it was built with
+        self._viz_dirty = True
+        self._viz_cache = None
+        self._viz_json = None  # (agent_version, bytes)
+        # Batch mode (begin_batch/end_batch): rated interactions whose similarity
+        # edges are deferred until the batch ends, in rating order
+        self._batch = False
+        self._pending_connections: Dict[str, None] = {}
+        # Written by ppo_train next to the model; relative to the script's
+        # execution directory (backend/)
+        self.version_file_path = "ppo_agent_version.txt"
+        # Last parsed agent version and the file mtime (ns) it was read at
+        self._ver_mtime = None
+        self._ver_cache = None
     
     def record_interaction(self, user_input: str, agent_response: str) -> str:
         """
@@ -48,231 +169,291 @@ class ReinforcementLoop:
         """
         interaction_id = str(uuid.uuid4())
         timestamp = time.time()
+        topics = extract_topics(user_input)
         
         # Store the interaction
-        self.interactions[interaction_id] = {
-            'user_input': user_input,
-            'agent_response': agent_response,
-            'timestamp': timestamp,
-            'topics': self._extract_topics(user_input)
-        }
+        self.interactions[interaction_id] = Interaction(user_input, agent_response, timestamp, topics)
+
+        # Index the interaction under each of its topics
+        for topic in topics:
+            self._topic_index[topic].add(interaction_id)
         
         # Add node to learning graph
-        self.learning_graph.add_node(
-            interaction_id, 
-            type='interaction',
-            user_input=user_input,
-            agent_response=agent_response,
-            timestamp=timestamp
-        )
+        self._add_node(self._id_map, interaction_id, 'interaction', {
+            'user_input': user_input,
+            'agent_response': agent_response,
+            'timestamp': timestamp
+        })
+        self._viz_dirty = True
         
         return interaction_id
     
     def record_feedback(self, interaction_id: str, rating: int, text_feedback: str = "") -> None: # Add text_feedback parameter
         """
         Record feedback for a specific interaction.
+
+        Stores the feedback and updates the performance metrics and the learning
+        graph in one pass, all stamped with the same timestamp.
         
         Args:
             interaction_id: The ID of the interaction
             rating: Numerical rating (1-5)
             text_feedback: Optional text comment
         """
-        if interaction_id not in self.interactions:
+        interaction = self.interactions.get(interaction_id)
+        if interaction is None:
             print(f"Warning: Interaction ID {interaction_id} not found for feedback.")
             return
+        # Ratings come straight from the client; reject anything else before touching
+        # any state (the ratings buffer is int8)
+        if isinstance(rating, bool) or not isinstance(rating, int) or not 1 <= rating <= 5:
+            print(f"Warning: Invalid rating {rating!r} for interaction {interaction_id}; expected an integer 1-5.")
+            return
+        timestamp = time.time()
         
         # Store the feedback (including text)
-        self.feedback[interaction_id] = {
-            'rating': rating,
-            'text': text_feedback, # Store text feedback
-            'timestamp': time.time()
-        }
+        self.feedback[interaction_id] = Feedback(rating, text_feedback, timestamp)
         
         # Update the interaction with feedback
-        self.interactions[interaction_id]['feedback'] = rating
-        self.interactions[interaction_id]['text_feedback'] = text_feedback # Store text feedback in interaction
-        
-        # Update performance metrics
-        self._update_performance_metrics(interaction_id, rating)
-        
-        # Update learning graph
-        self._update_learning_graph(interaction_id, rating)
-    
-    def get_visualization_data(self) -> Dict[str, Any]:
-        """
-        Get data for visualizing the reinforcement learning process.
-        
-        Returns:
-            Dictionary containing visualization data
-        """
-        return {
-            'graph': self._get_graph_data(),
-            'performance': self._get_performance_data(),
-            'topics': self._get_topic_performance(),
-            'agent_version': self._get_agent_version() # Add agent version
-        }
+        interaction.feedback = rating
+        interaction.text_feedback = text_feedback # Store text feedback in interaction
 
-    def _get_agent_version(self) -> Optional[float]:
-        """Read the agent version timestamp from the file."""
-        # Path relative to the script's execution directory (backend/)
-        version_file_path = "ppo_agent_version.txt" 
-        print(f"Attempting to read agent version from: {os.path.abspath(version_file_path)}") # Debug print
-        try:
-            if os.path.exists(version_file_path):
-                print(f"Version file found at: {version_file_path}") # Debug print
-                with open(version_file_path, "r") as f:
-                    timestamp_str = f.read().strip()
-                    print(f"Read timestamp string: '{timestamp_str}'") # Debug print
-                    timestamp = float(timestamp_str)
-                    print(f"Parsed timestamp: {timestamp}") # Debug print
-                    return timestamp
-            else:
-                print(f"Version file NOT found at: {version_file_path}") # Debug print
-                return None # Return None if file doesn't exist
-        except Exception as e:
-            print(f"Warning: Could not read or parse agent version file {version_file_path}: {e}")
-            return None # Return None on error
-    
-    def _extract_topics(self, text: str) -> List[str]:
-        """Extract topics from text using simple keyword matching."""
-        topics = []
-        
-        # Simple keyword-based topic extraction
-        topic_keywords = {
-            'mortgage_calculation': ['calculate', 'payment', 'monthly', 'mortgage', 'principal', 'interest'],
-            'loan_eligibility': ['eligible', 'eligibility', 'qualify', 'qualification', 'income', 'credit'],
-            'interest_rates': ['rate', 'interest', 'apr', 'percentage', 'fixed', 'variable'],
-            'loan_types': ['conventional', 'fha', 'va', 'usda', 'jumbo', 'fixed', 'arm'],
-            'home_buying_process': ['process', 'buying', 'purchase', 'offer', 'closing', 'escrow']
-        }
-        
-        text_lower = text.lower()
-        for topic, keywords in topic_keywords.items():
-            if any(keyword in text_lower for keyword in keywords):
-                topics.append(topic)
-        
-        return topics or ['general']
-    
-    def _update_performance_metrics(self, interaction_id: str, rating: int) -> None:
-        """Update performance metrics with new feedback."""
-        timestamp = time.time()
-        
-        # Add rating to history
-        self.performance_metrics['ratings'].append(rating)
-        self.performance_metrics['timestamps'].append(timestamp)
-        
-        # Calculate running average
-        all_ratings = self.performance_metrics['ratings']
-        avg_rating = np.mean(all_ratings) if all_ratings else 0
-        self.performance_metrics['average_ratings'].append(avg_rating)
-
-        # Calculate accuracy (percentage of ratings >= 4)
-        good_ratings = sum(1 for r in all_ratings if r >= 4)
-        accuracy = (good_ratings / len(all_ratings)) * 100 if all_ratings else 0
-        self.performance_metrics['accuracy'].append(accuracy)
+        # Update running totals: average, accuracy (percentage of ratings >= 4)
+        # and recent average rating (last 10)
+        n = self._n
+        n_ratings = n + 1
+        self._rating_sum += rating
+        if rating >= 4:
+            self._good_count += 1
+        if len(self._recent_ratings) == self._recent_ratings.maxlen:
+            self._recent_sum -= self._recent_ratings[0]
+        self._recent_ratings.append(rating)
+        self._recent_sum += rating
 
         # Update rating distribution
-        if 1 <= rating <= 5:
-            self.performance_metrics['rating_distribution'][rating] += 1
+        self.performance_metrics['rating_distribution'][rating] += 1
 
-        # Calculate recent average rating (last 10)
-        recent_ratings = all_ratings[-10:]
-        recent_avg = np.mean(recent_ratings) if recent_ratings else 0
-        self.performance_metrics['recent_average_rating'].append(recent_avg)
+        # Add rating and derived metrics to history
+        series = self._reserve_metric_slot()
+        series['ratings'][n] = rating
+        series['timestamps'][n] = timestamp
+        series['average_ratings'][n] = self._rating_sum / n_ratings
+        series['accuracy'][n] = (self._good_count / n_ratings) * 100
+        series['recent_average_rating'][n] = self._recent_sum / len(self._recent_ratings)
+        self._n = n_ratings
         
         # Update topic-specific metrics
-        topics = self.interactions[interaction_id].get('topics', ['general'])
-        for topic in topics:
-            if topic not in self.performance_metrics['topics']:
-                self.performance_metrics['topics'][topic] = {
+        topic_performance = self.performance_metrics['topics']
+        for topic in interaction.topics:
+            topic_metrics = topic_performance.get(topic)
+            if topic_metrics is None:
+                topic_metrics = topic_performance[topic] = {
                     'ratings': [],
                     'timestamps': [],
                     'average_ratings': []
                 }
-            
-            topic_metrics = self.performance_metrics['topics'][topic]
             topic_metrics['ratings'].append(rating)
             topic_metrics['timestamps'].append(timestamp)
+            self._topic_rating_sums[topic] += rating
             topic_metrics['average_ratings'].append(
-                np.mean(topic_metrics['ratings']) if topic_metrics['ratings'] else 0
+                self._topic_rating_sums[topic] / len(topic_metrics['ratings'])
             )
-    
-    def _update_learning_graph(self, interaction_id: str, rating: int) -> None:
-        """Update the learning graph with feedback information."""
-        # Add feedback node
-        feedback_id = f"feedback_{interaction_id}"
-        # Retrieve the text feedback stored for this interaction
-        text_feedback = self.interactions[interaction_id].get('text_feedback', '') # Retrieve stored text feedback
-        self.learning_graph.add_node(
-            feedback_id,
-            type='feedback',
-            rating=rating,
-            text=text_feedback, # Use the retrieved text feedback
-            timestamp=time.time()
-        )
         
-        # Connect feedback to interaction
-        self.learning_graph.add_edge(interaction_id, feedback_id)
+        # Add a feedback node to the learning graph and connect it to the interaction
+        feedback_node = self._add_node(self._feedback_id_map, interaction_id, 'feedback', {
+            'rating': rating,
+            'text': text_feedback,
+            'timestamp': timestamp
+        })
+        self._add_edge(self._id_map[interaction_id], feedback_node)
         
         # Add connections between similar interactions
-        self._connect_similar_interactions(interaction_id)
+        if self._batch:
+            self._pending_connections[interaction_id] = None
+        else:
+            self._connect_similar_interactions(interaction_id)
+        self._viz_dirty = True
+    
+    def begin_batch(self) -> None:
+        """
+        Start bulk-loading interactions and feedback (e.g. replaying history).
+        Similarity edges are not built until end_batch is called.
+        """
+        self._batch = True
+
+    def end_batch(self) -> None:
+        """
+        Finish a bulk load: connect every interaction rated during the batch to the
+        similar interactions recorded by now, in one pass over the topic index.
+        """
+        self._batch = False
+        pending, self._pending_connections = self._pending_connections, {}
+        for interaction_id in pending:
+            self._connect_similar_interactions(interaction_id)
+        self._viz_dirty = True
+
+    def get_visualization_data(self) -> Dict[str, Any]:
+        """
+        Get data for visualizing the reinforcement learning process.
+        
+        Returns:
+            Dictionary containing visualization data
+        """
+        return {**self._get_cached_visualization(), 'agent_version': self._get_agent_version()}
+
+    def get_visualization_json(self) -> bytes:
+        """
+        Get the visualization data serialized as JSON bytes.
+
+        The bytes are reused until an interaction or feedback is recorded or the
+        agent version changes.
+        """
+        cached = self._get_cached_visualization()
+        version = self._get_agent_version()
+        if self._viz_json is None or self._viz_json[0] != version:
+            self._viz_json = (version, dumps_bytes({**cached, 'agent_version': version}))
+        return self._viz_json[1]
+
+    def get_graph_patch(self, interaction_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get the learning graph change made by record_interaction, for clients that
+        already hold a visualization snapshot.
+
+        Args:
+            interaction_id: ID returned by record_interaction
+
+        Returns:
+            Dictionary with the nodes and edges to add to the client's graph
+        """
+        # A new interaction adds its own node; edges only appear once it is rated
+        return {
+            'add_nodes': [self._node_to_dict(self._nodes[self._id_map[interaction_id]])],
+            'add_edges': []
+        }
+
+    def _get_cached_visualization(self) -> Dict[str, Any]:
+        """Graph, performance and topic data, rebuilt only when the loop has changed."""
+        if self._viz_dirty or self._viz_cache is None:
+            self._viz_cache = {
+                'graph': self._get_graph_data(),
+                'performance': self._get_performance_data(),
+                'topics': self._get_topic_performance()
+            }
+            self._viz_json = None
+            self._viz_dirty = False
+        return self._viz_cache
+
+    def _get_agent_version(self) -> Optional[float]:
+        """Read the agent version timestamp from the file, re-reading it only when it changes."""
+        try:
+            mtime = os.stat(self.version_file_path).st_mtime_ns
+        except OSError:
+            # No trained agent yet
+            logger.debug("Version file not found at %s", self.version_file_path)
+            self._ver_mtime = self._ver_cache = None
+            return None
+
+        if mtime != self._ver_mtime:
+            try:
+                with open(self.version_file_path, "r") as f:
+                    self._ver_cache = float(f.read().strip())
+                logger.debug("Read agent version %s from %s", self._ver_cache, self.version_file_path)
+            except (OSError, ValueError) as e:
+                logger.warning("Could not read or parse agent version file %s: %s", self.version_file_path, e)
+                self._ver_cache = None
+            self._ver_mtime = mtime
+        return self._ver_cache
+    
+    def _reserve_metric_slot(self) -> Dict[str, Any]:
+        """
+        Make room for one more entry in every metric series (doubling the buffers
+        when full) and return the buffers.
+        """
+        if self._n == len(self._series['ratings']):
+            for name, buffer in self._series.items():
+                self._series[name] = np.resize(buffer, 2 * len(buffer))
+        return self._series
     
     def _connect_similar_interactions(self, new_interaction_id: str) -> None:
         """Connect similar interactions in the learning graph."""
-        new_interaction = self.interactions[new_interaction_id]
-        new_topics = set(new_interaction.get('topics', []))
+        new_topics = self.interactions[new_interaction_id].topic_set
         
-        for interaction_id, interaction in self.interactions.items():
-            if interaction_id == new_interaction_id:
-                continue
-            
+        # Only interactions sharing at least one topic can be similar
+        candidates = set().union(*(self._topic_index[topic] for topic in new_topics))
+        candidates.discard(new_interaction_id)
+
+        new_node = self._id_map[new_interaction_id]
+        for interaction_id in candidates:
             # Connect interactions with similar topics
-            interaction_topics = set(interaction.get('topics', []))
-            if new_topics.intersection(interaction_topics):
-                # Create edges in both directions
-                self.learning_graph.add_edge(
-                    new_interaction_id, 
-                    interaction_id, 
-                    type='similar_topic',
-                    weight=len(new_topics.intersection(interaction_topics))
-                )
+            shared_topics = new_topics & self.interactions[interaction_id].topic_set
+            self._add_edge(
+                new_node, 
+                self._id_map[interaction_id], 
+                edge_type='similar_topic',
+                weight=len(shared_topics)
+            )
+
+    def _add_node(self, id_map: Dict[str, int], interaction_id: str, node_type: str,
+                  data: Dict[str, Any]) -> int:
+        """
+        Add a node to the learning graph, replacing its data if it already exists.
+
+        Args:
+            id_map: Map from interaction ID to node ID for this kind of node
+            interaction_id: The interaction the node belongs to
+            node_type: 'interaction' or 'feedback'
+            data: Node payload shown in the visualization
+
+        Returns:
+            The node's integer ID
+        """
+        node = (node_type, interaction_id, data)
+        node_id = id_map.get(interaction_id)
+        if node_id is None:
+            node_id = id_map[interaction_id] = len(self._nodes)
+            self._nodes.append(node)
+        else:
+            self._nodes[node_id] = node
+        return node_id
+
+    def _add_edge(self, source: int, target: int, edge_type: str = 'default', weight: int = 1) -> None:
+        """Add a directed edge to the learning graph unless it is already there."""
+        if (source, target) in self._edge_keys:
+            return
+        self._edge_keys.add((source, target))
+        self._edges.append((source, target, edge_type, weight))
+
+    @staticmethod
+    def _node_key(node: Tuple[str, str, Dict[str, Any]]) -> str:
+        """String ID of a node in the visualization data."""
+        node_type, interaction_id, _ = node
+        return interaction_id if node_type == 'interaction' else f"feedback_{interaction_id}"
+
+    @classmethod
+    def _node_to_dict(cls, node: Tuple[str, str, Dict[str, Any]]) -> Dict[str, Any]:
+        """A node in the visualization format."""
+        return {'id': cls._node_key(node), 'type': node[0], 'data': node[2]}
     
     def _get_graph_data(self) -> Dict[str, Any]:
         """Convert the learning graph to a format suitable for visualization."""
-        nodes = []
-        for node_id in self.learning_graph.nodes():
-            node_data = self.learning_graph.nodes[node_id]
-            nodes.append({
-                'id': node_id,
-                'type': node_data.get('type', 'unknown'),
-                'data': {k: v for k, v in node_data.items() if k != 'type'}
-            })
-        
-        edges = []
-        for source, target, data in self.learning_graph.edges(data=True):
-            edges.append({
-                'source': source,
-                'target': target,
-                'type': data.get('type', 'default'),
-                'weight': data.get('weight', 1)
-            })
-        
+        keys = [self._node_key(node) for node in self._nodes]
         return {
-            'nodes': nodes,
-            'edges': edges
+            'nodes': [
+                {'id': key, 'type': node_type, 'data': data}
+                for key, (node_type, _, data) in zip(keys, self._nodes)
+            ],
+            'edges': [
+                {'source': keys[source], 'target': keys[target], 'type': edge_type, 'weight': weight}
+                for source, target, edge_type, weight in self._edges
+            ]
         }
     
     def _get_performance_data(self) -> Dict[str, Any]:
         """Get performance metrics for visualization."""
-        # Return the relevant parts of the performance_metrics dict
-        return {
-            'timestamps': self.performance_metrics['timestamps'],
-            'ratings': self.performance_metrics['ratings'],
-            'average_ratings': self.performance_metrics['average_ratings'],
-            'accuracy': self.performance_metrics['accuracy'],
-            'rating_distribution': self.performance_metrics['rating_distribution'],
-            'recent_average_rating': self.performance_metrics['recent_average_rating']
-        }
+        # Only the filled part of each buffer, as plain lists for JSON
+        performance = {name: buffer[:self._n].tolist() for name, buffer in self._series.items()}
+        performance['rating_distribution'] = dict(self.performance_metrics['rating_distribution'])
+        return performance
     
     def _get_topic_performance(self) -> Dict[str, Dict]:
         """Get topic-specific performance metrics."""
@@ -280,30 +461,27 @@ class ReinforcementLoop:
 
     def export_episodes_for_rl(self):
         """
-        Export episodes as (state, action, reward, text_feedback) tuples for RL training.
-        For demo: state = hash of user_input, action = hash of agent_response, reward = feedback rating.
+        Export episodes as (user_input, action, reward, text_feedback) tuples for RL training.
+        The user_input is turned into the PPO state by StateEncoder at training time.
+        For demo: action = hash of agent_response, reward = feedback rating.
         If the feedback text contains actionable cues, adjust the reward.
         """
         episodes = []
-        for interaction_id, interaction in self.interactions.items():
-            user_input = interaction.get('user_input', '')
-            agent_response = interaction.get('agent_response', '')
-            reward = interaction.get('feedback', None)
-            text_feedback = interaction.get('text_feedback', '') # Get text feedback
+        for interaction in self.interactions.values():
+            user_input = interaction.user_input
+            agent_response = interaction.agent_response
+            reward = interaction.feedback
+            text_feedback = interaction.text_feedback # Get text feedback
 
             # Reward shaping based on feedback text
             adjusted_reward = reward
-            if isinstance(text_feedback, str):
-                text_lower = text_feedback.lower()
-                if "concise" in text_lower:
-                    adjusted_reward = max(1, reward - 1) if reward is not None else None
-                elif "explain" in text_lower or "more detail" in text_lower:
-                    adjusted_reward = max(1, reward - 1) if reward is not None else None
-                # You can add more rules here
+            if reward is not None and isinstance(text_feedback, str) and _SHAPING_RE.search(text_feedback):
+                adjusted_reward = max(1, reward - 1)
+                # You can add more rules here (e.g. a pattern -> reward delta table)
 
             if reward is not None:
-                # For demo: use hash as state/action (in practice, use embeddings or indices)
-                state = abs(hash(user_input)) % 1000
-                action = abs(hash(agent_response)) % 10
-                episodes.append((state, action, adjusted_reward, text_feedback)) # Include text feedback
+                # For demo: use hash as action (in practice, use indices).
+                # A stable hash keeps the action the same across processes and runs
+                action = stable_hash(agent_response) % 10
+                episodes.append((user_input, action, adjusted_reward, text_feedback)) # Include text feedback
         return episodes
@@ -1,43 +1,51 @@
 import gymnasium as gym
 import numpy as np
+from app.embeddings import STATE_DIM
 
 class HomeLoanAgentEnv(gym.Env):
     """
     Custom RL environment for the Home Loan Assistant agent.
-    State: Encoded user message (for demo, use integer index or embedding).
+    State: Encoded user message (PCA-projected sentence embedding, see StateEncoder).
     Action: Discrete set of response templates or tool choices.
     Reward: User feedback rating (1-5, normalized).
     """
-    def __init__(self, episodes):
+    def __init__(self, states, actions, rewards):
         super().__init__()
-        self.episodes = episodes  # List of (state, action, reward) tuples
+        # Episode data as parallel arrays: states (n, STATE_DIM) float32,
+        # actions (n,) int64, rewards (n,) float32
+        self.states = states
+        self.actions = actions
+        # Rewards normalized to [0, 1] once here rather than on every step
+        self.rewards = np.asarray(rewards, dtype=np.float32) / np.float32(5.0)
+        self.n_episodes = len(states)
         self.current_idx = 0
+        # Observation returned once the episode data is exhausted
+        self._terminal_state = np.zeros(STATE_DIM, dtype=np.float32)
 
-        # For demo: state is an integer index, action is discrete
-        self.observation_space = gym.spaces.Discrete(1000)  # e.g., 1000 possible user message types
+        # State is a fixed-size float vector, action is discrete
+        self.observation_space = gym.spaces.Box(-np.inf, np.inf, shape=(STATE_DIM,), dtype=np.float32)
         self.action_space = gym.spaces.Discrete(10)         # e.g., 10 possible response types
 
     def reset(self, seed=None, options=None):
         self.current_idx = 0
-        if len(self.episodes) == 0:
-            return 0, {}
-        state, _, _ = self.episodes[self.current_idx]
-        return state, {}
+        if self.n_episodes == 0:
+            return self._terminal_state, {}
+        return self.states[self.current_idx], {}
 
     def step(self, action):
         # Get reward for this (state, action) pair
-        if self.current_idx >= len(self.episodes):
-            return 0, 0.0, True, False, {}
+        n_episodes = self.n_episodes
+        if self.current_idx >= n_episodes:
+            return self._terminal_state, 0.0, True, False, {}
 
-        state, true_action, reward = self.episodes[self.current_idx]
-        done = self.current_idx == len(self.episodes) - 1
+        done = self.current_idx == n_episodes - 1
 
         # Reward is only given if action matches the true action (for demo)
         # In practice, you may want to use reward directly from feedback
-        reward = float(reward) / 5.0  # Normalize to [0, 1]
+        reward = float(self.rewards[self.current_idx])
 
         self.current_idx += 1
-        next_state = self.episodes[self.current_idx][0] if self.current_idx < len(self.episodes) else 0
+        next_state = self.states[self.current_idx] if self.current_idx < n_episodes else self._terminal_state
 
         return next_state, reward, done, False, {}
 
@@ -1,6 +1,10 @@
 import os
+import uuid
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from app import socketio
 from app.agent import HomeLoanLangChainAgent # Use the new LangChain agent
 from app.reinforcement import ReinforcementLoop
@@ -15,6 +19,22 @@ main = Blueprint('main', __name__)
 agent = HomeLoanLangChainAgent() # Use the new LangChain agent
 reinforcement_loop = ReinforcementLoop()
 
+# PPO training is CPU-bound, so it runs in a separate process to keep this worker
+# serving chat traffic; created on the first training request (see _get_training_executor)
+_training_executor = None
+
+def _get_training_executor() -> ProcessPoolExecutor:
+    """
+    Process pool for training jobs. One worker queues overlapping requests. Spawn
+    avoids forking the eventlet hub and loaded models; the child imports only
+    app.ppo_train and its dependencies (run.py keeps its startup code under
+    __main__ so it isn't re-run there).
+    """
+    global _training_executor
+    if _training_executor is None:
+        _training_executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+    return _training_executor
+
 @main.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -50,9 +70,8 @@ def handle_message(data):
         'interaction_id': interaction_id
     })
     
-    # Send initial visualization data
-    viz_data = reinforcement_loop.get_visualization_data()
-    socketio.emit('visualization_update', viz_data)
+    # Send only the new graph node; the full visualization is sent after feedback
+    socketio.emit('viz_patch', reinforcement_loop.get_graph_patch(interaction_id))
 
 @socketio.on('feedback')
 def handle_feedback(data):
@@ -75,39 +94,29 @@ def handle_feedback(data):
 @main.route('/api/visualization', methods=['GET'])
 def get_visualization():
     """Get visualization data for the reinforcement learning process"""
-    viz_data = reinforcement_loop.get_visualization_data()
-    return jsonify(viz_data)
+    # Serialized once per change to the loop and reused between requests
+    return Response(reinforcement_loop.get_visualization_json(), mimetype='application/json')
 
 @main.route('/api/train_agent', methods=['POST'])
 def train_agent():
     """
-    Trigger PPO training for the agent using collected feedback.
-    Returns before/after performance metrics.
+    Start PPO training for the agent in the background using collected feedback.
+    Returns a job ID right away; a 'training_complete' event with before/after
+    performance metrics is emitted when training finishes.
     """
     print("Entered /api/train_agent endpoint")
     try:
         from app.ppo_train import train_ppo_agent
         # Capture metrics before training
         before_metrics = reinforcement_loop.get_visualization_data().get('performance', {})
-        print("Starting PPO training...")
-        model_path = train_ppo_agent(reinforcement_loop)
-        print("PPO training finished, preparing response...")
-        after_metrics = reinforcement_loop.get_visualization_data().get('performance', {})
-        
-        response_data = {
-            "status": "training complete" if model_path else "no data",
-            "model_path": model_path,
-            "before_metrics": before_metrics,
-            "after_metrics": after_metrics
-        }
-        
-        # Emit visualization update AFTER training to refresh frontend data (including version)
-        print("Emitting visualization update after training...")
-        viz_data = reinforcement_loop.get_visualization_data()
-        socketio.emit('visualization_update', viz_data)
-        
-        print("Returning JSON response from /api/train_agent")
-        return jsonify(response_data) # Return the JSON response correctly
+        # Only plain episode tuples cross the process boundary
+        episodes = reinforcement_loop.export_episodes_for_rl()
+        print(f"Submitting PPO training on {len(episodes)} episodes...")
+        job_id = str(uuid.uuid4())
+        future = _get_training_executor().submit(train_ppo_agent, episodes)
+        future.add_done_callback(functools.partial(_on_training_done, job_id, before_metrics))
+
+        return jsonify({"status": "training started", "job_id": job_id}), 202
 
     except Exception as e:
         import traceback
@@ -118,3 +127,27 @@ def train_agent():
             "error": str(e),
             "traceback": traceback.format_exc()
         }), 500
+
+def _on_training_done(job_id, before_metrics, future):
+    """Report a finished training job to clients."""
+    try:
+        model_path = future.result()
+        if model_path:
+            # Switch the running agent to the newly trained policy and state encoder
+            agent.reload_ppo()
+        print("PPO training finished, notifying clients...")
+        result = {
+            "job_id": job_id,
+            "status": "training complete" if model_path else "no data",
+            "model_path": model_path,
+            "before_metrics": before_metrics,
+            "after_metrics": reinforcement_loop.get_visualization_data().get('performance', {})
+        }
+    except Exception as e:
+        # The training process itself failed (train_ppo_agent handles its own errors)
+        print("Error in PPO training job:", str(e))
+        result = {"job_id": job_id, "status": "error", "error": str(e)}
+    socketio.emit('training_complete', result)
+
+    # Refresh frontend data (including version) after training
+    socketio.emit('visualization_update', reinforcement_loop.get_visualization_data())
@@ -0,0 +1,105 @@
+import hashlib
+import re
+import threading
+import numpy as np
+from typing import Callable, List, Optional, Sequence, Tuple
+from app.embeddings import embed
+
+# Numbers in a question (amounts, rates, terms). Embeddings barely tell "6.5%" from
+# "7%", so these must match exactly for a cached answer to be reused.
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+
+# Words that usually refer back to earlier turns ("explain that", "what about 20 years?")
+_FOLLOW_UP_RE = re.compile(
+    r"\b(?:it|its|that|this|those|these|them|above|previous|earlier|again|instead|same"
+    r"|what about|how about|more detail)\b",
+    re.IGNORECASE,
+)
+
+def is_self_contained(text: str) -> bool:
+    """
+    Whether a message can be answered without the conversation so far. Errs on the
+    side of False: follow-ups must not be cached or served from the cache.
+    """
+    return _FOLLOW_UP_RE.search(text) is None
+
+def history_window(messages: Sequence, turns: int) -> str:
+    """
+    Cache context for a conversation: the text of its last `turns` turns (each a
+    user message and an answer), or an empty string when turns is 0.
+    """
+    if turns <= 0:
+        return ""
+    return "\n".join(f"{message.type}: {message.content}" for message in messages[-2 * turns:])
+
+class SemanticCache:
+    """
+    In-process semantic cache for agent responses.
+
+    Each entry is keyed by the embedding of the user input plus a digest of the
+    conversation context it was answered in and the numbers in the input. A lookup
+    hits when context and numbers match exactly and the cosine similarity of the
+    inputs reaches the threshold.
+    """
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 1024,
+                 embed_fn: Callable[[str], np.ndarray] = embed):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._embed = embed_fn
+
+        # Ring buffer of normalized embeddings; inner product == cosine similarity
+        self._vectors: Optional[np.ndarray] = None
+        self._context_ids = np.zeros(max_entries, dtype=np.int64)
+        self._entries: List[Tuple[str, str]] = []
+        self._next_slot = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, user_input: str, context: str) -> Optional[Tuple[str, str, float]]:
+        """
+        Find a cached answer for a similar input asked in the same context.
+
+        Args:
+            user_input: The user's message
+            context: The conversation history the message is asked in
+
+        Returns:
+            Tuple of (response, thinking, similarity), or None on a miss
+        """
+        query = self._embed(user_input)
+        context_id = self._context_id(user_input, context)
+        with self._lock:
+            if not self._entries:
+                return None
+            count = len(self._entries)
+            similarities = self._vectors[:count] @ query
+            similarities[self._context_ids[:count] != context_id] = -np.inf
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                return None
+            response, thinking = self._entries[best]
+        return response, thinking, similarity
+
+    def store(self, user_input: str, context: str, response: str, thinking: str) -> None:
+        """Add an answer to the cache, evicting the oldest entry when full."""
+        vector = self._embed(user_input)
+        context_id = self._context_id(user_input, context)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.empty((self.max_entries, vector.shape[0]), dtype=np.float32)
+            slot = self._next_slot
+            self._vectors[slot] = vector
+            self._context_ids[slot] = context_id
+            if slot < len(self._entries):
+                self._entries[slot] = (response, thinking)
+            else:
+                self._entries.append((response, thinking))
+            self._next_slot = (slot + 1) % self.max_entries
+
+    @staticmethod
+    def _context_id(user_input: str, context: str) -> int:
+        """Stable 64-bit digest of the conversation context and the numbers in the input."""
+        numbers = " ".join(_NUMBER_RE.findall(user_input))
+        digest = hashlib.blake2b(f"{numbers}\0{context}".encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little", signed=True)
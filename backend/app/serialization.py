@@ -0,0 +1,19 @@
+import orjson
+
+# Integer dict keys (rating_distribution) and NumPy scalars/arrays serialize directly
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def dumps_bytes(obj) -> bytes:
+    """Serialize obj to compact JSON bytes."""
+    return orjson.dumps(obj, option=_OPTIONS)
+
+def dumps(obj, *args, **kwargs) -> str:
+    """
+    json.dumps-compatible wrapper so this module can be passed to SocketIO(json=...).
+    Formatting arguments (separators, indent) are ignored; output is always compact.
+    """
+    return orjson.dumps(obj, option=_OPTIONS).decode("utf-8")
+
+def loads(s, *args, **kwargs):
+    """json.loads-compatible wrapper around orjson.loads."""
+    return orjson.loads(s)
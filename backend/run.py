@@ -1,24 +1,33 @@
 import os
 from dotenv import load_dotenv
-from app import create_app, socketio
 
-# Load environment variables from .env file in the current directory (backend/)
-# By default, load_dotenv looks for .env in the current working directory or parent directories.
-# Since we run `python run.py` from within the `backend` directory, it should find `backend/.env`.
-load_dotenv() 
+# Everything below runs only when this file is the entry point. Training jobs run in
+# spawned processes, which re-import the main module as __mp_main__; they must not
+# monkey-patch, create the app, or load the agent again.
+if __name__ == '__main__':
+    # Monkey-patch the standard library before anything else imports socket/threading,
+    # so blocking LLM calls yield to other green threads
+    import eventlet
+    eventlet.monkey_patch()
 
-# Check if the key was loaded successfully
-api_key = os.environ.get('OPENROUTER_API_KEY')
-if not api_key:
-    print("ERROR: OPENROUTER_API_KEY not found in environment variables. Make sure it's set in backend/.env")
-    # Optionally, exit or raise an error here if the key is critical
-    # import sys
-    # sys.exit("API key is missing.")
+    from app import create_app, socketio
 
-# Create Flask app
-app = create_app()
+    # Load environment variables from .env file in the current directory (backend/)
+    # By default, load_dotenv looks for .env in the current working directory or parent directories.
+    # Since we run `python run.py` from within the `backend` directory, it should find `backend/.env`.
+    load_dotenv() 
+
+    # Check if the key was loaded successfully
+    api_key = os.environ.get('OPENROUTER_API_KEY')
+    if not api_key:
+        print("ERROR: OPENROUTER_API_KEY not found in environment variables. Make sure it's set in backend/.env")
+        # Optionally, exit or raise an error here if the key is critical
+        # import sys
+        # sys.exit("API key is missing.")
+
+    # Create Flask app
+    app = create_app()
 
-if __name__ == '__main__':
     # Run the app with Socket.IO
     print("Starting Home Loan Assistant server...")
     print(f"OpenRouter API Key: {os.environ.get('OPENROUTER_API_KEY')[:10]}...")
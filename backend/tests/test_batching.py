@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from app.batching import MicroBatcher
+
+
+def test_results_follow_submission_order():
+    batch_sizes = []
+
+    def double(rows):
+        batch_sizes.append(len(rows))
+        return rows * 2
+
+    batcher = MicroBatcher(double, max_batch=8, max_wait=0.05)
+    futures = [batcher.submit(np.array([i, -i], dtype=np.float32)) for i in range(20)]
+
+    for i, future in enumerate(futures):
+        np.testing.assert_array_equal(future.result(timeout=5), [2 * i, -2 * i])
+    assert sum(batch_sizes) == 20
+    assert max(batch_sizes) <= 8
+
+
+def test_exception_reaches_every_future_in_the_batch():
+    def fail(rows):
+        raise ValueError(f"bad batch of {len(rows)}")
+
+    batcher = MicroBatcher(fail, max_batch=4, max_wait=0.05)
+    futures = [batcher.submit(np.zeros(2)) for _ in range(3)]
+
+    for future in futures:
+        with pytest.raises(ValueError, match="bad batch"):
+            future.result(timeout=5)
+
+    # The worker keeps serving after a failed batch
+    batcher.batch_fn = lambda rows: rows + 1
+    np.testing.assert_array_equal(batcher.submit(np.zeros(2)).result(timeout=5), [1, 1])
@@ -0,0 +1,39 @@
+import numpy as np
+import torch
+from stable_baselines3 import PPO
+
+from app.embeddings import STATE_DIM, StateEncoder
+from app.policy import NumpyPolicy
+from app.ppo_train import export_policy_weights
+from app.rl_env import HomeLoanAgentEnv
+
+
+def _small_model():
+    rng = np.random.default_rng(0)
+    states = rng.standard_normal((32, STATE_DIM)).astype(np.float32)
+    actions = rng.integers(0, 10, size=32)
+    rewards = rng.integers(1, 6, size=32).astype(np.float32)
+    env = HomeLoanAgentEnv(states, actions, rewards)
+    model = PPO("MlpPolicy", env, n_steps=64, batch_size=32, seed=0, verbose=0)
+    model.learn(total_timesteps=64)
+    return model
+
+
+def test_numpy_policy_matches_sb3_policy(tmp_path):
+    model = _small_model()
+    encoder = StateEncoder(np.zeros(8, dtype=np.float32), np.zeros((STATE_DIM, 8), dtype=np.float32))
+    path = tmp_path / "ppo_agent_policy.npz"
+    export_policy_weights(model, str(path), encoder)
+
+    policy = NumpyPolicy.load(str(path))
+    states = np.random.default_rng(1).standard_normal((50, STATE_DIM)).astype(np.float32)
+
+    expected_actions, _ = model.predict(states, deterministic=True)
+    with torch.no_grad():
+        obs, _ = model.policy.obs_to_tensor(states)
+        expected_probs = model.policy.get_distribution(obs).distribution.probs.cpu().numpy()
+
+    np.testing.assert_array_equal(policy.predict(states), expected_actions)
+    np.testing.assert_allclose(policy.action_probs(states), expected_probs, rtol=1e-5, atol=1e-6)
+    with np.load(path) as data:
+        np.testing.assert_array_equal(data["state_components"], encoder.components)
@@ -0,0 +1,85 @@
+import copy
+
+import pytest
+
+from app.reinforcement import ReinforcementLoop
+
+
+def _rate_all(loop, ratings, user_input="What mortgage rate can I get?"):
+    for rating in ratings:
+        loop.record_feedback(loop.record_interaction(user_input, "answer"), rating)
+
+
+def _similar_edges(loop):
+    edges = loop.get_visualization_data()['graph']['edges']
+    return [(edge['source'], edge['target']) for edge in edges if edge['type'] == 'similar_topic']
+
+
+def test_metrics_over_many_ratings():
+    loop = ReinforcementLoop()
+    ratings = [5, 1, 4, 2, 3, 5, 5, 4, 1, 2, 3, 4, 5, 1, 2]
+    _rate_all(loop, ratings)
+
+    performance = loop.get_visualization_data()['performance']
+    assert performance['ratings'] == ratings
+    for n in range(1, len(ratings) + 1):
+        seen = ratings[:n]
+        recent = seen[-10:]
+        assert performance['average_ratings'][n - 1] == pytest.approx(sum(seen) / n)
+        assert performance['accuracy'][n - 1] == pytest.approx(100 * sum(r >= 4 for r in seen) / n)
+        assert performance['recent_average_rating'][n - 1] == pytest.approx(sum(recent) / len(recent))
+    assert performance['rating_distribution'] == {r: ratings.count(r) for r in range(1, 6)}
+
+
+def test_metric_buffers_grow_past_initial_capacity():
+    loop = ReinforcementLoop()
+    ratings = [(i % 5) + 1 for i in range(150)]
+    _rate_all(loop, ratings)
+
+    performance = loop.get_visualization_data()['performance']
+    assert performance['ratings'] == ratings
+    assert len(performance['timestamps']) == len(ratings)
+    assert performance['timestamps'] == sorted(performance['timestamps'])
+    assert performance['average_ratings'][-1] == pytest.approx(sum(ratings) / len(ratings))
+
+
+def test_similarity_edges_are_not_duplicated():
+    loop = ReinforcementLoop()
+    first = loop.record_interaction("What mortgage rate can I get?", "answer")
+    second = loop.record_interaction("Is a 6% interest rate good?", "answer")
+    loop.record_feedback(second, 4)
+    loop.record_feedback(second, 5)
+    loop.record_feedback(first, 3)
+    loop.record_feedback(first, 2)
+
+    edges = _similar_edges(loop)
+    assert sorted(edges) == sorted([(second, first), (first, second)])
+
+
+def test_invalid_ratings_leave_state_unchanged():
+    loop = ReinforcementLoop()
+    _rate_all(loop, [4, 2])
+    interaction_id = loop.record_interaction("Am I eligible for a loan?", "answer")
+    before = (copy.deepcopy(loop.performance_metrics), loop._get_performance_data(), list(loop._edges))
+
+    for rating in (0, 6, 4.7, True):
+        loop.record_feedback(interaction_id, rating)
+
+    assert (loop.performance_metrics, loop._get_performance_data(), loop._edges) == before
+    assert interaction_id not in loop.feedback
+    assert loop.interactions[interaction_id].feedback is None
+    assert len(loop.export_episodes_for_rl()) == 2
+
+
+def test_batch_defers_similarity_edges():
+    loop = ReinforcementLoop()
+    loop.begin_batch()
+    first = loop.record_interaction("What mortgage rate can I get?", "answer")
+    loop.record_feedback(first, 4)
+    second = loop.record_interaction("Is a 6% interest rate good?", "answer")
+    loop.record_feedback(second, 5)
+    assert _similar_edges(loop) == []
+
+    loop.end_batch()
+    assert sorted(_similar_edges(loop)) == sorted([(first, second), (second, first)])
+    assert loop.get_visualization_data()['performance']['ratings'] == [4, 5]
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+import re
+
+from app.semantic_cache import SemanticCache, history_window, is_self_contained
+
+QUESTION = "What is the monthly payment on a 300k loan at 6.5% over 30 years?"
+
+
+def _embed(text):
+    """Deterministic stand-in for the MiniLM embedding: one unit vector per text."""
+    vector = np.random.default_rng(abs(hash(text)) % 2**32).standard_normal(8).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def _embed_ignoring_numbers(text):
+    """Stand-in for an embedding that, like MiniLM, barely reacts to numbers."""
+    return _embed(re.sub(r"[\d.,%]+", "#", text))
+
+
+def _message(kind, content):
+    return SimpleNamespace(type=kind, content=content)
+
+
+def test_same_question_twice_hits():
+    cache = SemanticCache(embed_fn=_embed)
+    history = []
+
+    # First ask: miss, then the answer is stored and the conversation grows
+    context = history_window(history, 0)
+    assert cache.lookup(QUESTION, context) is None
+    cache.store(QUESTION, context, "Monthly payment: $1896.20", "thinking")
+    history += [_message("human", QUESTION), _message("ai", "Monthly payment: $1896.20")]
+
+    # Second ask of the same question is served from the cache
+    hit = cache.lookup(QUESTION, history_window(history, 0))
+    assert hit is not None
+    response, thinking, similarity = hit
+    assert response == "Monthly payment: $1896.20"
+    assert similarity > 0.99
+
+
+def test_history_window_keeps_only_last_turns():
+    history = [_message("human", f"q{i}") if i % 2 == 0 else _message("ai", f"a{i}") for i in range(6)]
+    assert history_window(history, 0) == ""
+    assert history_window(history, 1) == "human: q4\nai: a5"
+    assert history_window(history[:2], 3) == "human: q0\nai: a1"
+
+
+def test_different_context_misses():
+    cache = SemanticCache(embed_fn=_embed)
+    cache.store(QUESTION, "human: earlier question", "answer", "thinking")
+    assert cache.lookup(QUESTION, "") is None
+
+
+def test_questions_differing_only_in_rate_do_not_share_an_answer():
+    cache = SemanticCache(embed_fn=_embed_ignoring_numbers)
+    first = "Monthly payment on 300k at 6.5% over 30 years?"
+    second = "Monthly payment on 300k at 7% over 30 years?"
+    cache.store(first, "", "Monthly payment: $1896.20", "thinking")
+
+    assert cache.lookup(second, "") is None
+    assert cache.lookup(first, "") is not None
+
+
+def test_follow_ups_are_not_self_contained():
+    assert is_self_contained("What are current 30-year fixed rates?")
+    assert not is_self_contained("Explain that in more detail")
+    assert not is_self_contained("What about 20 years?")
@@ -0,0 +1,38 @@
+from app.agent import _calculate_mortgage, _parse_parameters
+
+
+def test_parse_parameters():
+    assert _parse_parameters("principal=300000, rate=6.5, term=30") == {
+        "principal": "300000", "rate": "6.5", "term": "30"
+    }
+
+
+def test_parse_parameters_keeps_empty_values():
+    assert _parse_parameters("principal=300000, rate=, term=30") == {
+        "principal": "300000", "rate": "", "term": "30"
+    }
+
+
+def test_calculate_mortgage():
+    assert _calculate_mortgage("principal=300000, rate=6.5, term=30") == "Monthly payment: $1896.20"
+
+
+def test_calculate_mortgage_rejects_empty_rate():
+    assert _calculate_mortgage("principal=300000, rate=, term=30").startswith("Error calculating mortgage")
+
+
+def test_calculate_mortgage_zero_rate():
+    assert _calculate_mortgage("principal=360000, rate=0, term=30") == "Monthly payment: $1000.00"
+
+
+def test_calculate_mortgage_tiny_rate():
+    assert _calculate_mortgage("principal=1, rate=1e-15, term=7") == "Monthly payment: $0.01"
+
+
+def test_calculate_mortgage_rejects_huge_term():
+    assert _calculate_mortgage("principal=300000, rate=6.5, term=10000000000000000000").startswith("Invalid input")
+
+
+def test_calculate_mortgage_rejects_nan_rate():
+    assert _calculate_mortgage("principal=300000, rate=nan, term=30").startswith("Invalid input")
+    assert _calculate_mortgage("principal=inf, rate=6.5, term=30").startswith("Invalid input")
@@ -24,6 +24,7 @@ const App = () => {
   const [activeTab, setActiveTab] = useState<'chat' | 'visualization' | 'docs'>('chat');
   const [isThinking, setIsThinking] = useState<boolean>(false); // Add thinking state
   const socketRef = useRef<ReturnType<typeof io> | null>(null);
+  const hasVisualizationRef = useRef<boolean>(false); // Whether a full snapshot has arrived
   const messagesEndRef = useRef<HTMLDivElement | null>(null);
 
   // Connect to WebSocket server
@@ -72,9 +73,33 @@ const App = () => {
     // Handle visualization updates
     socketRef.current.on('visualization_update', (data) => {
       console.log('Received visualization update:', data);
+      hasVisualizationRef.current = true;
       setVisualizationData(data);
     });
 
+    // Handle incremental graph updates sent after each chat message
+    socketRef.current.on('viz_patch', (patch) => {
+      if (!hasVisualizationRef.current) {
+        // Nothing to patch yet: fetch the full snapshot, which already includes this change
+        hasVisualizationRef.current = true;
+        fetch('/api/visualization')
+          .then(res => res.json())
+          .then(data => setVisualizationData(data))
+          .catch(err => {
+            console.error('Failed to fetch visualization data:', err);
+            hasVisualizationRef.current = false;
+          });
+        return;
+      }
+      setVisualizationData((prev: any) => prev && {
+        ...prev,
+        graph: {
+          nodes: [...prev.graph.nodes, ...patch.add_nodes],
+          edges: [...prev.graph.edges, ...patch.add_edges]
+        }
+      });
+    });
+
     // Cleanup on component unmount
     return () => {
       if (socketRef.current) {
@@ -198,7 +223,7 @@ const App = () => {
               </div>
               <div className="flex-1 overflow-y-auto p-4">
                 {visualizationData ? (
-                  <VisualizationPanel data={visualizationData} />
+                  <VisualizationPanel data={visualizationData} socket={socketRef.current} />
                 ) : (
                   <div className="flex items-center justify-center h-full">
                     <p className="text-gray-500">
@@ -259,7 +284,7 @@ const App = () => {
             </div>
             <div className="flex-1 overflow-y-auto p-4">
               {visualizationData ? (
-                <VisualizationPanel data={visualizationData} />
+                <VisualizationPanel data={visualizationData} socket={socketRef.current} />
               ) : (
                 <div className="flex items-center justify-center h-full">
                   <p className="text-gray-500">
@@ -1,4 +1,5 @@
-import React, { useRef, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
+import type { Socket } from 'socket.io-client';
 import { 
   BarChart, Bar, LineChart, Line, XAxis, YAxis, CartesianGrid, 
   Tooltip, Legend, ResponsiveContainer, PieChart, Pie, Cell 
@@ -35,9 +36,10 @@ interface VisualizationPanelProps {
     }>;
     agent_version?: number; // Add agent version timestamp (optional)
   };
+  socket?: Socket | null; // Delivers 'training_complete' for background training jobs
 }
 
-const VisualizationPanel: React.FC<VisualizationPanelProps> = ({ data }) => {
+const VisualizationPanel: React.FC<VisualizationPanelProps> = ({ data, socket }) => {
   const graphRef = useRef<any>(null);
   const [selectedNode, setSelectedNode] = useState<any | null>(null);
   const [showNodeDetails, setShowNodeDetails] = useState(false);
@@ -45,6 +47,22 @@ const VisualizationPanel: React.FC<VisualizationPanelProps> = ({ data }) => {
   // RL training state
   const [training, setTraining] = useState(false);
   const [trainResult, setTrainResult] = useState<any | null>(null);
+  const trainJobIdRef = useRef<string | null>(null); // Job started from this panel
+
+  // Training runs in the background; its result arrives over the socket
+  useEffect(() => {
+    if (!socket) return;
+    const handleTrainingComplete = (result: any) => {
+      if (result.job_id !== trainJobIdRef.current) return; // Not our job
+      trainJobIdRef.current = null;
+      setTrainResult(result);
+      setTraining(false);
+    };
+    socket.on('training_complete', handleTrainingComplete);
+    return () => {
+      socket.off('training_complete', handleTrainingComplete);
+    };
+  }, [socket]);
 
   // Format timestamps for display
   const formatTimestamp = (timestamp: number) => {
@@ -108,6 +126,11 @@ const VisualizationPanel: React.FC<VisualizationPanelProps> = ({ data }) => {
     try {
       const res = await fetch('/api/train_agent', { method: 'POST' });
       const result = await res.json();
+      if (res.status === 202) {
+        // Accepted: keep showing progress until 'training_complete' arrives
+        trainJobIdRef.current = result.job_id;
+        return;
+      }
       setTrainResult(result);
     } catch (err) {
       setTrainResult({ status: 'error', error: String(err) });